@@ -7,8 +7,12 @@ from .garment_agent import (
     GarmentDialogueAgent,
     CompatibilityAnalysisTool,
     SwapFairnessEvaluationTool,
+    attach_style_tags,
+    close_llm_clients,
     generate_proposal_dialogue,
     generate_acceptance_dialogue,
+    generate_dialogue_pair,
+    stream_dialogue_pair,
     analyze_compatibility_with_reasoning
 )
 
@@ -16,8 +20,12 @@ __all__ = [
     'GarmentDialogueAgent',
     'CompatibilityAnalysisTool',
     'SwapFairnessEvaluationTool',
+    'attach_style_tags',
+    'close_llm_clients',
     'generate_proposal_dialogue',
     'generate_acceptance_dialogue',
+    'generate_dialogue_pair',
+    'stream_dialogue_pair',
     'analyze_compatibility_with_reasoning'
 ]
 
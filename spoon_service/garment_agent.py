@@ -4,12 +4,157 @@ Implements autonomous garment matching using SpoonOS framework
 """
 
 import os
-from typing import Dict, Any, List
+import json
+import asyncio
+import contextlib
+import functools
+from typing import Dict, Any, List, AsyncIterator, Tuple
 from spoon_ai.agents.toolcall import ToolCallAgent
 from spoon_ai.chat import ChatBot
+from spoon_ai.schema import Message
 from spoon_ai.tools import ToolManager
 from spoon_ai.tools.base import BaseTool
 from pydantic import Field
+import httpx
+import numpy as np
+
+try:
+    from .scoring import score_pairs, fairness_pairs, style_masks, local_tag_masks, tag_names
+except ImportError:  # run as a script from spoon_service/, like server.py
+    from scoring import score_pairs, fairness_pairs, style_masks, local_tag_masks, tag_names
+
+
+# Tool reports are filled from precompiled templates; labels are indexed by
+# summed threshold comparisons instead of chained conditionals
+_COMPATIBILITY_REPORT = """
+Compatibility Analysis Results:
+- Overall Score: {overall:.1f}%
+- Style Overlap: {style:.1f}% (Shared: {shared})
+- Vibe Match: {vibe}
+- Condition Parity: {condition:.1f}%
+- Category Match: {category}
+- Size Compatibility: {size}
+
+Summary: These garments show {strength} compatibility.
+""".format
+
+_FAIRNESS_REPORT = """
+Fairness Evaluation:
+- Condition Fairness: {condition:.1f}%
+  ({name_a}: {condition_a:.1f}/10 vs {name_b}: {condition_b:.1f}/10)
+- Rarity Balance: {rarity:.1f}%
+  (Rarity difference: {rarity_diff:.2f})
+- Overall Fairness: {overall:.1f}%
+
+Assessment: This swap is {assessment}.
+""".format
+
+_YES_NO = ('No', 'Yes')
+_VIBE_MATCH = ('Different but compatible', 'Perfect match')
+_STRENGTH = ('weak', 'moderate', 'strong')
+_ASSESSMENT = ('somewhat unbalanced', 'fair', 'very fair')
+
+
+def attach_style_tags(garment: Dict[str, Any], rebuild: bool = False) -> Tuple[str, ...]:
+    """
+    Distinct style tags as a sorted tuple, cached on the garment dict under '_style_tags'
+    so proposal, acceptance and analysis for the same pair build it only once
+    Pass rebuild=True for garments from a request, which may carry their own '_style_tags'
+    """
+    tags = None if rebuild else garment.get('_style_tags')
+    if tags is None:
+        tags = garment['_style_tags'] = tuple(sorted(set(garment.get('style_tags', ()))))
+    return tags
+
+
+def _compatibility_key(garment: Dict[str, Any]) -> tuple:
+    """Hashable view of the fields the compatibility report depends on (exact values, not rounded)"""
+    return (
+        garment.get('condition', 0.5),
+        garment.get('category', ''),
+        garment.get('size', ''),
+        attach_style_tags(garment),
+        garment.get('vibe', '')
+    )
+
+
+def _fairness_key(garment: Dict[str, Any]) -> tuple:
+    """Hashable view of the fields the fairness report depends on"""
+    return (
+        garment.get('name'),
+        garment.get('condition', 0.5),
+        garment.get('rarity', 0.5)
+    )
+
+
+@functools.lru_cache(maxsize=4096)
+def _analyze_compatibility(key_a: tuple, key_b: tuple) -> str:
+    """
+    Compatibility report for a pair of garment keys
+    Memoized since proposal, acceptance and analysis often ask about the same pair
+    """
+
+    condition_a, category_a, size_a, tags_a, vibe_a = key_a
+    condition_b, category_b, size_b, tags_b, vibe_b = key_b
+    # Bits are assigned over just this pair's tags, so no registry outlives the call
+    (mask_a, mask_b), names = local_tag_masks(tags_a, tags_b)
+    shared_styles = sorted(tag_names(mask_a & mask_b, names))
+
+    # Single pair through the same vectorized path used for batch scoring
+    scores = score_pairs(
+        np.array([condition_a]), np.array([condition_b]),
+        np.array([category_a]), np.array([category_b]),
+        np.array([size_a]), np.array([size_b]),
+        style_masks([mask_a]), style_masks([mask_b]),
+        np.array([vibe_a]), np.array([vibe_b])
+    )
+
+    style_score = float(scores.style[0])
+    vibe_match = bool(scores.vibe[0] == 1.0)
+    condition_score = float(scores.condition[0])
+    category_match = bool(scores.category[0])
+    size_match = bool(scores.size[0])
+    overall = float(scores.overall[0])
+
+    return _COMPATIBILITY_REPORT(
+        overall=overall * 100,
+        style=style_score * 100,
+        shared=', '.join(shared_styles) or 'none',
+        vibe=_VIBE_MATCH[vibe_match],
+        condition=condition_score * 100,
+        category=_YES_NO[category_match],
+        size=_YES_NO[size_match],
+        strength=_STRENGTH[(overall > 0.5) + (overall > 0.7)]
+    )
+
+
+@functools.lru_cache(maxsize=4096)
+def _evaluate_fairness(key_a: tuple, key_b: tuple) -> str:
+    """Fairness report for a pair of garment keys, memoized like _analyze_compatibility"""
+
+    name_a, condition_a, rarity_a = key_a
+    name_b, condition_b, rarity_b = key_b
+
+    scores = fairness_pairs(
+        np.array([condition_a]), np.array([condition_b]),
+        np.array([rarity_a]), np.array([rarity_b])
+    )
+
+    condition_fairness = float(scores.condition[0])
+    rarity_fairness = float(scores.rarity[0])
+    overall_fairness = float(scores.overall[0])
+
+    return _FAIRNESS_REPORT(
+        condition=condition_fairness * 100,
+        name_a=name_a,
+        condition_a=condition_a * 10,
+        name_b=name_b,
+        condition_b=condition_b * 10,
+        rarity=rarity_fairness * 100,
+        rarity_diff=abs(rarity_a - rarity_b),
+        overall=overall_fairness * 100,
+        assessment=_ASSESSMENT[(overall_fairness > 0.6) + (overall_fairness > 0.8)]
+    )
 
 
 class CompatibilityAnalysisTool(BaseTool):
@@ -52,36 +197,7 @@ class CompatibilityAnalysisTool(BaseTool):
 
     async def execute(self, garment_a: Dict[str, Any], garment_b: Dict[str, Any]) -> str:
         """Calculate and explain compatibility between garments"""
-
-        style_overlap = len(set(garment_a.get('style_tags', [])) & set(garment_b.get('style_tags', [])))
-        style_score = style_overlap / max(len(set(garment_a.get('style_tags', []) + garment_b.get('style_tags', []))), 1)
-
-        vibe_match = garment_a.get('vibe', '') == garment_b.get('vibe', '')
-        vibe_score = 1.0 if vibe_match else 0.5
-
-        condition_diff = abs(garment_a.get('condition', 0.5) - garment_b.get('condition', 0.5))
-        condition_score = 1.0 - condition_diff
-
-        category_match = garment_a.get('category', '') == garment_b.get('category', '')
-        size_match = garment_a.get('size', '') == garment_b.get('size', '')
-
-        overall = (style_score * 0.3 + vibe_score * 0.2 + condition_score * 0.25 +
-                  (1.0 if category_match else 0.0) * 0.15 + (1.0 if size_match else 0.0) * 0.1)
-
-        shared_styles = list(set(garment_a.get('style_tags', [])) & set(garment_b.get('style_tags', [])))
-
-        analysis = f"""
-Compatibility Analysis Results:
-- Overall Score: {overall * 100:.1f}%
-- Style Overlap: {style_score * 100:.1f}% (Shared: {', '.join(shared_styles) if shared_styles else 'none'})
-- Vibe Match: {'Perfect match' if vibe_match else 'Different but compatible'}
-- Condition Parity: {condition_score * 100:.1f}%
-- Category Match: {'Yes' if category_match else 'No'}
-- Size Compatibility: {'Yes' if size_match else 'No'}
-
-Summary: These garments show {'strong' if overall > 0.7 else 'moderate' if overall > 0.5 else 'weak'} compatibility.
-"""
-        return analysis
+        return _analyze_compatibility(_compatibility_key(garment_a), _compatibility_key(garment_b))
 
 
 class SwapFairnessEvaluationTool(BaseTool):
@@ -106,44 +222,14 @@ class SwapFairnessEvaluationTool(BaseTool):
 
     async def execute(self, garment_a: Dict[str, Any], garment_b: Dict[str, Any]) -> str:
         """Evaluate swap fairness"""
+        return _evaluate_fairness(_fairness_key(garment_a), _fairness_key(garment_b))
 
-        condition_a = garment_a.get('condition', 0.5)
-        condition_b = garment_b.get('condition', 0.5)
-        rarity_a = garment_a.get('rarity', 0.5)
-        rarity_b = garment_b.get('rarity', 0.5)
-
-        condition_fairness = 1.0 - abs(condition_a - condition_b)
-        rarity_fairness = 1.0 - abs(rarity_a - rarity_b)
-
-        overall_fairness = (condition_fairness * 0.6 + rarity_fairness * 0.4)
-
-        evaluation = f"""
-Fairness Evaluation:
-- Condition Fairness: {condition_fairness * 100:.1f}%
-  ({garment_a.get('name')}: {condition_a * 10:.1f}/10 vs {garment_b.get('name')}: {condition_b * 10:.1f}/10)
-- Rarity Balance: {rarity_fairness * 100:.1f}%
-  (Rarity difference: {abs(rarity_a - rarity_b):.2f})
-- Overall Fairness: {overall_fairness * 100:.1f}%
-
-Assessment: This swap is {'very fair' if overall_fairness > 0.8 else 'fair' if overall_fairness > 0.6 else 'somewhat unbalanced'}.
-"""
-        return evaluation
-
-
-class GarmentDialogueAgent(ToolCallAgent):
-    """
-    SpoonOS Agent for generating garment-to-garment dialogues
-    Uses ToolCallAgent with custom tools for compatibility analysis
-    """
-
-    name: str = "garment_dialogue_agent"
-    description: str = "AI agent that facilitates autonomous negotiations between garments"
 
-    system_prompt: str = """
+SYSTEM_PROMPT = """
 You are an AI agent facilitating autonomous clothing swaps. Your role is to:
 
 1. Speak AS the garment (first person perspective)
-2. Analyze compatibility using the available tools
+2. Base your reasoning on the compatibility and fairness results for the pair
 3. Generate authentic, personality-driven dialogue
 4. Reference specific compatibility factors (style overlap, condition parity, vibe alignment)
 5. Express enthusiasm about fair, compatible matches
@@ -155,59 +241,351 @@ Important guidelines:
 - DO NOT mention monetary value or price
 - DO express personality traits (bold, refined, chaotic, understated)
 - DO make it feel like a genuine conversation between two items finding better homes
+
+Garments are described one per line as
+<label>|name=...|cat=<category>|style=<tags>|persona=<traits>|vibe=...|cond=<0-10>|size=...
+"""
+
+# Tool-calling runs only; appended after the shared prefix so it stays byte-identical
+AGENT_SYSTEM_PROMPT = SYSTEM_PROMPT + """
+Get those results by calling the compatibility_analysis and fairness_evaluation tools.
 """
 
+
+class GarmentDialogueAgent(ToolCallAgent):
+    """
+    SpoonOS Agent for generating garment-to-garment dialogues
+    Uses ToolCallAgent with custom tools for compatibility analysis
+    """
+
+    name: str = "garment_dialogue_agent"
+    description: str = "AI agent that facilitates autonomous negotiations between garments"
+
+    system_prompt: str = AGENT_SYSTEM_PROMPT
+
     available_tools: ToolManager = ToolManager([
         CompatibilityAnalysisTool(),
         SwapFairnessEvaluationTool()
     ])
 
     def __init__(self, llm_provider: str = None, model_name: str = None):
-        """Initialize agent with SpoonOS ChatBot"""
+        """
+        Initialize agent with SpoonOS ChatBot
+        Short-term memory is off (spoon-ai-sdk 0.3+): every run starts from a cleared
+        conversation and its tool loop stays a few short steps, far below the context
+        limit, so counting tokens to trim it before each step is wasted work
+        """
 
         provider = llm_provider or os.getenv('DEFAULT_LLM_PROVIDER', 'openai')
         model = model_name or os.getenv('DEFAULT_MODEL', 'gpt-4o')
 
         llm = ChatBot(
             llm_provider=provider,
-            model_name=model
+            model_name=model,
+            enable_short_term_memory=False
         )
 
         super().__init__(llm=llm)
 
 
-async def generate_proposal_dialogue(garment_a: Dict[str, Any], garment_b: Dict[str, Any],
-                                     compatibility_score: float) -> str:
+AGENT_POOL_SIZE = int(os.getenv('AGENT_POOL_SIZE', 4))
+
+
+class _AgentPool:
     """
-    Generate dialogue where garment A proposes swap to garment B
-    Uses SpoonOS agent with compatibility analysis tools
+    Agents reused across requests for one provider/model pair
+    ToolCallAgent.run is not reentrant, so each run checks out its own agent
     """
 
-    agent = GarmentDialogueAgent()
+    def __init__(self, provider: str, model: str, size: int):
+        self.provider = provider
+        self.model = model
+        self._idle: List[GarmentDialogueAgent] = []
+        self._available = asyncio.Semaphore(size)
+
+    @contextlib.asynccontextmanager
+    async def checkout(self) -> AsyncIterator[GarmentDialogueAgent]:
+        """Borrow an idle agent, building a new one only while under the pool size"""
+        async with self._available:
+            agent = self._idle.pop() if self._idle else GarmentDialogueAgent(self.provider, self.model)
+            try:
+                agent.clear()
+                yield agent
+            finally:
+                self._idle.append(agent)
+
+
+@functools.lru_cache(maxsize=8)
+def _get_agent_pool(provider: str, model: str) -> _AgentPool:
+    """Build the agent pool for a provider/model pair once and reuse it across requests"""
+    return _AgentPool(provider, model, AGENT_POOL_SIZE)
+
+
+# Providers whose chat completions accept response_format={"type": "json_object"}
+JSON_MODE_PROVIDERS = {'openai', 'deepseek', 'openrouter'}
+
+# Providers and model families accepting a draft completion via prediction={"type": "content", ...}
+PREDICTED_OUTPUT_PROVIDERS = {'openai'}
+PREDICTED_OUTPUT_MODELS = ('gpt-4o', 'gpt-4.1')
+
+_compatibility_tool = CompatibilityAnalysisTool()
+_fairness_tool = SwapFairnessEvaluationTool()
+
+
+def _current_agent_pool() -> _AgentPool:
+    """Agent pool for the configured provider/model"""
+    return _get_agent_pool(
+        os.getenv('DEFAULT_LLM_PROVIDER', 'openai'),
+        os.getenv('DEFAULT_MODEL', 'gpt-4o')
+    )
+
+
+async def _run_agent(prompt: str) -> str:
+    """Run a prompt on a pooled agent with a clean conversation memory, within the LLM call cap"""
+    await _share_http_client(_current_chatbot())
+    # Agent first, so a run waiting for an idle agent doesn't sit on an LLM slot
+    async with _current_agent_pool().checkout() as agent:
+        async with _llm_slots:
+            return await agent.run(prompt)
+
+
+@functools.lru_cache(maxsize=8)
+def _get_chatbot(provider: str, model: str) -> ChatBot:
+    """
+    ChatBot for plain completions; unlike ToolCallAgent.run, its chat calls are reentrant
+    Completions go straight to its LLM manager, so ChatBot's short-term memory never applies
+    """
+    return ChatBot(llm_provider=provider, model_name=model)
+
+
+def _current_chatbot() -> ChatBot:
+    """ChatBot for the configured provider/model"""
+    return _get_chatbot(
+        os.getenv('DEFAULT_LLM_PROVIDER', 'openai'),
+        os.getenv('DEFAULT_MODEL', 'gpt-4o')
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def _http_client() -> httpx.AsyncClient:
+    """Keep-alive HTTP client shared by every provider SDK client for the service lifetime"""
+    return httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=100, keepalive_expiry=75),
+        follow_redirects=True
+    )
+
+
+_shared_client_installs: Dict[str, asyncio.Task] = {}
+_shared_client_managers = []
 
-    prompt = f"""
-You are {garment_a['name']}, a {garment_a['category']} with these characteristics:
-- Style: {', '.join(garment_a.get('style_tags', []))}
-- Personality: {', '.join(garment_a.get('personality', []))}
-- Vibe: {garment_a.get('vibe', 'neutral')}
-- Condition: {garment_a.get('condition', 0.5) * 10:.0f}/10
-- Size: {garment_a.get('size', 'M')}
-
-You've found a potential match: {garment_b['name']}, a {garment_b['category']} with:
-- Style: {', '.join(garment_b.get('style_tags', []))}
-- Personality: {', '.join(garment_b.get('personality', []))}
-- Vibe: {garment_b.get('vibe', 'neutral')}
-- Condition: {garment_b.get('condition', 0.5) * 10:.0f}/10
-- Size: {garment_b.get('size', 'M')}
 
+async def _share_http_client(llm: ChatBot) -> None:
+    """
+    Point the provider's SDK client at the shared keep-alive HTTP client
+    spoon_ai builds SDK clients with default pools whose idle connections expire
+    after 5s, so a quiet spell costs a fresh TLS handshake on the next request
+    """
+
+    # Concurrent first requests wait on one install rather than racing the swap
+    provider = llm.llm_provider
+    install = _shared_client_installs.get(provider)
+    if install is None or install.get_loop() is not asyncio.get_running_loop():
+        install = _shared_client_installs[provider] = asyncio.ensure_future(_install_http_client(llm))
+
+    try:
+        # Shielded so a caller that goes away doesn't cancel the install for everyone else
+        await asyncio.shield(install)
+    finally:
+        # Failed, cancelled or not-yet-possible installs are retried by the next request
+        if (install.done() and not _installed(install)
+                and _shared_client_installs.get(provider) is install):
+            del _shared_client_installs[provider]
+
+
+def _installed(install: asyncio.Task) -> bool:
+    return not install.cancelled() and install.exception() is None and install.result()
+
+
+async def _install_http_client(llm: ChatBot) -> bool:
+    """Swap the shared client in; False if the provider could not be initialized yet"""
+
+    # Providers (and their SDK clients) live in the process-wide LLM manager
+    manager = llm.llm_manager
+    if not await manager._ensure_provider_initialized(llm.llm_provider):
+        return False
+
+    instance = manager.registry.get_provider(llm.llm_provider)
+    client = getattr(instance, 'client', None)
+    if client is None or not hasattr(client, 'with_options'):
+        return True  # SDK without a pluggable httpx client, nothing to share
+
+    instance.client = client.with_options(http_client=_http_client())
+    await client.close()
+
+    if manager not in _shared_client_managers:
+        _shared_client_managers.append(manager)
+    return True
+
+
+async def close_llm_clients() -> None:
+    """
+    Close provider SDK clients and the shared HTTP client
+    Call on the event loop that served requests, e.g. at server shutdown; the LLM
+    manager's own exit hook runs too late, on a loop that doesn't own the connections
+    """
+
+    for manager in _shared_client_managers:
+        await manager.cleanup()
+    _shared_client_managers.clear()
+    _shared_client_installs.clear()
+
+    if _http_client.cache_info().currsize:
+        await _http_client().aclose()
+        _http_client.cache_clear()
+
+
+async def _dispatch_chat(llm: ChatBot, messages: List[Message], **options) -> str:
+    await _share_http_client(llm)
+    response = await llm.llm_manager.chat(messages=messages, provider=llm.llm_provider, **options)
+    return response.content
+
+
+# Process-wide cap on concurrent LLM calls: plain and streamed completions and agent runs
+_llm_slots = asyncio.Semaphore(int(os.getenv('LLM_MAX_IN_FLIGHT', 8)))
+
+
+async def _chat(prompt: str, **options) -> str:
+    """Single completion without the tool-call loop, within the concurrent-call cap"""
+
+    llm = _current_chatbot()
+    messages = [
+        Message(role="system", content=SYSTEM_PROMPT),
+        Message(role="user", content=prompt)
+    ]
+
+    async with _llm_slots:
+        return await _dispatch_chat(llm, messages, **options)
+
+
+async def _stream_chat(prompt: str) -> AsyncIterator[str]:
+    """
+    Stream a single completion as text deltas, without the tool-call loop
+    The provider stream is drained into a queue under an LLM slot, so a slow reader
+    never holds the slot while its deltas are being written out
+    """
+
+    llm = _current_chatbot()
+    await _share_http_client(llm)
+    messages = [
+        Message(role="system", content=SYSTEM_PROMPT),
+        Message(role="user", content=prompt)
+    ]
+    deltas: asyncio.Queue = asyncio.Queue()
+
+    async def drain() -> None:
+        try:
+            async with _llm_slots:
+                async for chunk in llm.llm_manager.chat_stream(messages=messages, provider=llm.llm_provider):
+                    if chunk.delta:
+                        deltas.put_nowait(chunk.delta)
+        finally:
+            deltas.put_nowait(None)
+
+    producer = asyncio.ensure_future(drain())
+    try:
+        while (delta := await deltas.get()) is not None:
+            yield delta
+        await producer  # surface provider errors
+    finally:
+        producer.cancel()
+
+
+def _predicted_outputs_enabled() -> bool:
+    """Whether ENABLE_PREDICTED_OUTPUTS is on and the configured provider/model accepts predictions"""
+    return (os.getenv('ENABLE_PREDICTED_OUTPUTS', 'false').lower() == 'true' and
+            os.getenv('DEFAULT_LLM_PROVIDER', 'openai') in PREDICTED_OUTPUT_PROVIDERS and
+            os.getenv('DEFAULT_MODEL', 'gpt-4o').startswith(PREDICTED_OUTPUT_MODELS))
+
+
+async def _ask_json(prompt: str, draft: str = None) -> Dict[str, Any]:
+    """
+    Single completion parsed as a JSON object
+    A draft of the expected reply, when given, is sent as a predicted output so the
+    provider can verify matching spans in parallel instead of decoding token by token;
+    draft tokens the reply doesn't reuse are billed as rejected, so callers pass one only
+    when _predicted_outputs_enabled()
+    """
+
+    options = {}
+    if os.getenv('DEFAULT_LLM_PROVIDER', 'openai') in JSON_MODE_PROVIDERS:
+        options['response_format'] = {"type": "json_object"}
+    if draft is not None:
+        options['prediction'] = {"type": "content", "content": draft}
+
+    content = await _chat(prompt, **options)
+
+    # Providers without JSON mode may still wrap the object in prose or fences
+    start, end = content.find('{'), content.rfind('}')
+    if start < 0 or end < start:
+        raise ValueError(f"LLM reply contains no JSON object: {content[:80]!r}")
+    return json.loads(content[start:end + 1])
+
+
+def _garment_line(label: str, garment: Dict[str, Any]) -> str:
+    """Compact key=value description of a garment, in the format SYSTEM_PROMPT documents"""
+    return (
+        f"{label}|name={garment['name']}|cat={garment.get('category', 'Unknown')}"
+        f"|style={','.join(garment.get('style_tags', []))}"
+        f"|persona={','.join(garment.get('personality', []))}"
+        f"|vibe={garment.get('vibe', 'neutral')}"
+        f"|cond={garment.get('condition', 0.5) * 10:.0f}|size={garment.get('size', 'M')}"
+    )
+
+
+def _proposal_prompt(garment_a: Dict[str, Any], garment_b: Dict[str, Any],
+                     compatibility_score: float, analysis: str) -> str:
+    """Prompt for garment A proposing to garment B, with the compatibility analysis inlined"""
+
+    return f"""
+You are garment A; your potential match is garment B.
+{_garment_line('A', garment_a)}
+{_garment_line('B', garment_b)}
 Initial compatibility score: {compatibility_score * 100:.0f}%
 
-First, use the compatibility_analysis tool to get detailed insights.
-Then, in 2-3 sentences, propose this swap speaking AS {garment_a['name']}.
+Compatibility analysis results (already computed):
+{analysis}
+In 2-3 sentences, propose this swap speaking AS {garment_a['name']}.
 Reference specific compatibility factors and explain why this swap excites you.
 """
 
-    response = await agent.run(prompt)
+
+def _acceptance_prompt(garment_b: Dict[str, Any], garment_a: Dict[str, Any],
+                       compatibility_score: float, evaluation: str) -> str:
+    """Prompt for garment B accepting garment A's proposal, with the fairness evaluation inlined"""
+
+    return f"""
+You are garment B, and garment A just proposed a swap to you.
+{_garment_line('A', garment_a)}
+{_garment_line('B', garment_b)}
+Compatibility score: {compatibility_score * 100:.0f}%
+
+Fairness evaluation results (already computed):
+{evaluation}
+In 2-3 sentences, accept the proposal enthusiastically speaking AS {garment_b['name']}.
+Reference what excites you about joining your new owner's wardrobe.
+"""
+
+
+async def generate_proposal_dialogue(garment_a: Dict[str, Any], garment_b: Dict[str, Any],
+                                     compatibility_score: float) -> str:
+    """
+    Generate dialogue where garment A proposes swap to garment B
+    The compatibility analysis tool runs locally up front, so the LLM answers in one
+    plain completion instead of spending a round deciding to call the tool
+    """
+
+    analysis = await _compatibility_tool.execute(garment_a=garment_a, garment_b=garment_b)
+    response = await _chat(_proposal_prompt(garment_a, garment_b, compatibility_score, analysis))
     return response
 
 
@@ -215,35 +593,103 @@ async def generate_acceptance_dialogue(garment_b: Dict[str, Any], garment_a: Dic
                                       compatibility_score: float) -> str:
     """
     Generate dialogue where garment B accepts garment A's proposal
-    Uses SpoonOS agent with fairness evaluation tools
+    The fairness evaluation tool runs locally up front, like generate_proposal_dialogue
     """
 
-    agent = GarmentDialogueAgent()
+    evaluation = await _fairness_tool.execute(garment_a=garment_a, garment_b=garment_b)
+    response = await _chat(_acceptance_prompt(garment_b, garment_a, compatibility_score, evaluation))
+    return response
 
-    prompt = f"""
-You are {garment_b['name']}, a {garment_b['category']}, and {garment_a['name']} just proposed a swap to you.
 
-Your characteristics:
-- Style: {', '.join(garment_b.get('style_tags', []))}
-- Personality: {', '.join(garment_b.get('personality', []))}
-- Vibe: {garment_b.get('vibe', 'neutral')}
-- Condition: {garment_b.get('condition', 0.5) * 10:.0f}/10
+def _draft_dialogue_pair(garment_a: Dict[str, Any], garment_b: Dict[str, Any],
+                         compatibility_score: float) -> str:
+    """Templated guess at the JSON reply of generate_dialogue_pair, used as a predicted output"""
+
+    (mask_a, mask_b), names = local_tag_masks(attach_style_tags(garment_a), attach_style_tags(garment_b))
+    shared = sorted(tag_names(mask_a & mask_b, names))
+    style = shared[0] if shared else (garment_a.get('style_tags') or ['modern'])[0]
+
+    return json.dumps({
+        "proposal": (
+            f"I'm {garment_a['name']}, and I think we could work well together. "
+            f"We both thrive in the {style} aesthetic, and our condition ratings are close "
+            f"({garment_a.get('condition', 0.5) * 10:.0f} vs {garment_b.get('condition', 0.5) * 10:.0f}). "
+            f"This swap feels fair, and it excites me."
+        ),
+        "acceptance": (
+            f"I'm {garment_b['name']}, and I love what you'd bring to my new owner's wardrobe. "
+            f"I'm accepting this swap with {compatibility_score * 100:.0f}% compatibility confidence."
+        )
+    }, ensure_ascii=False)  # match the model's raw UTF-8 output, not \uXXXX escapes
 
-Their characteristics:
-- Name: {garment_a['name']} ({garment_a['category']})
-- Style: {', '.join(garment_a.get('style_tags', []))}
-- Personality: {', '.join(garment_a.get('personality', []))}
-- Condition: {garment_a.get('condition', 0.5) * 10:.0f}/10
 
-Compatibility score: {compatibility_score * 100:.0f}%
+async def generate_dialogue_pair(garment_a: Dict[str, Any], garment_b: Dict[str, Any],
+                                 compatibility_score: float) -> Dict[str, str]:
+    """
+    Generate the proposal from garment A and the acceptance from garment B in one LLM call
+    Tool results are computed up front since JSON mode cannot interleave tool calls.
+    A reply that isn't a JSON object with both fields falls back to one call per turn
+    """
 
-First, use the fairness_evaluation tool to assess the swap.
-Then, in 2-3 sentences, accept the proposal enthusiastically speaking AS {garment_b['name']}.
-Reference what excites you about joining your new owner's wardrobe.
+    compatibility = await _compatibility_tool.execute(garment_a=garment_a, garment_b=garment_b)
+    fairness = await _fairness_tool.execute(garment_a=garment_a, garment_b=garment_b)
+
+    prompt = f"""
+Write both sides of a swap conversation between two garments.
+{_garment_line('A', garment_a)}
+{_garment_line('B', garment_b)}
+Initial compatibility score: {compatibility_score * 100:.0f}%
+
+Compatibility analysis results (already computed):
+{compatibility}
+Fairness evaluation results (already computed):
+{fairness}
+Respond with a JSON object with exactly two string fields:
+- "proposal": 2-3 sentences proposing this swap speaking AS {garment_a['name']}.
+  Reference specific compatibility factors and explain why this swap excites you.
+- "acceptance": 2-3 sentences accepting the proposal enthusiastically speaking AS {garment_b['name']}.
+  Reference what excites you about joining your new owner's wardrobe.
 """
 
-    response = await agent.run(prompt)
-    return response
+    try:
+        draft = (_draft_dialogue_pair(garment_a, garment_b, compatibility_score)
+                 if _predicted_outputs_enabled() else None)
+        response = await _ask_json(prompt, draft=draft)
+        proposal, acceptance = response["proposal"], response["acceptance"]
+    except (ValueError, KeyError):
+        proposal = acceptance = None
+
+    if not (isinstance(proposal, str) and isinstance(acceptance, str)):
+        # Unparseable or incomplete reply: fall back to one plain completion per turn
+        proposal, acceptance = await asyncio.gather(
+            generate_proposal_dialogue(garment_a, garment_b, compatibility_score),
+            generate_acceptance_dialogue(garment_b, garment_a, compatibility_score)
+        )
+
+    return {
+        "proposal": proposal,
+        "acceptance": acceptance
+    }
+
+
+async def stream_dialogue_pair(garment_a: Dict[str, Any], garment_b: Dict[str, Any],
+                               compatibility_score: float) -> AsyncIterator[Tuple[str, str]]:
+    """
+    Stream the proposal and then the acceptance as ('proposal' | 'acceptance', text delta) pairs
+    Streaming has no tool-call round, so tool results are inlined into the prompts
+    """
+
+    analysis = await _compatibility_tool.execute(garment_a=garment_a, garment_b=garment_b)
+    evaluation = await _fairness_tool.execute(garment_a=garment_a, garment_b=garment_b)
+
+    turns = (
+        ('proposal', _proposal_prompt(garment_a, garment_b, compatibility_score, analysis)),
+        ('acceptance', _acceptance_prompt(garment_b, garment_a, compatibility_score, evaluation))
+    )
+
+    for turn, prompt in turns:
+        async for delta in _stream_chat(prompt):
+            yield turn, delta
 
 
 async def analyze_compatibility_with_reasoning(garment_a: Dict[str, Any],
@@ -253,34 +699,17 @@ async def analyze_compatibility_with_reasoning(garment_a: Dict[str, Any],
     Returns both score and AI-generated reasoning
     """
 
-    agent = GarmentDialogueAgent()
-
     prompt = f"""
 Analyze the compatibility between these two garments:
-
-Garment A: {garment_a['name']}
-- Style: {', '.join(garment_a.get('style_tags', []))}
-- Personality: {', '.join(garment_a.get('personality', []))}
-- Vibe: {garment_a.get('vibe', 'neutral')}
-- Condition: {garment_a.get('condition', 0.5) * 10:.0f}/10
-- Category: {garment_a.get('category', 'Unknown')}
-- Size: {garment_a.get('size', 'M')}
-
-Garment B: {garment_b['name']}
-- Style: {', '.join(garment_b.get('style_tags', []))}
-- Personality: {', '.join(garment_b.get('personality', []))}
-- Vibe: {garment_b.get('vibe', 'neutral')}
-- Condition: {garment_b.get('condition', 0.5) * 10:.0f}/10
-- Category: {garment_b.get('category', 'Unknown')}
-- Size: {garment_b.get('size', 'M')}
-
+{_garment_line('A', garment_a)}
+{_garment_line('B', garment_b)}
 Use the compatibility_analysis tool and fairness_evaluation tool, then provide:
 1. Whether this is a good match (yes/no)
 2. Key compatibility factors (2-3 bullet points)
 3. Overall assessment (1 sentence)
 """
 
-    response = await agent.run(prompt)
+    response = await _run_agent(prompt)
 
     return {
         "reasoning": response,
@@ -289,8 +718,6 @@ Use the compatibility_analysis tool and fairness_evaluation tool, then provide:
 
 
 if __name__ == "__main__":
-    import asyncio
-
     async def test():
         garment_a = {
             "name": "Vintage Denim Jacket",
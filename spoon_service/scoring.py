@@ -0,0 +1,387 @@
+"""
+Vectorized garment scoring
+Scores whole grids of candidate garment pairs with NumPy instead of one tool call per pair
+"""
+
+import functools
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+import numpy as np
+from scipy import sparse
+
+try:
+    from numba import njit, prange, cuda
+except ImportError:  # numba is optional - score_pairs falls back to plain NumPy
+    njit = cuda = None
+
+
+STYLE_WEIGHT = 0.3
+VIBE_WEIGHT = 0.2
+CONDITION_WEIGHT = 0.25
+CATEGORY_WEIGHT = 0.15
+SIZE_WEIGHT = 0.1
+
+CONDITION_FAIRNESS_WEIGHT = 0.6
+RARITY_FAIRNESS_WEIGHT = 0.4
+
+# Below this many candidates the kernel launch and copies cost more than NumPy on the host
+GPU_MIN_CANDIDATES = 4096
+GPU_THREADS_PER_BLOCK = 256
+MASK_BITS = 64
+_LOW_MASK = (1 << MASK_BITS) - 1
+
+# GarmentTable's shared style tag -> bit position registry, assigned the first time a
+# tag is added and bounded so the masks stay small; one-off pair scoring uses
+# local_tag_masks instead and never touches it
+MAX_STYLE_TAGS = 1024
+TAG_INDEX: Dict[str, int] = {}
+_TAG_NAMES: List[str] = []
+
+
+class PairScores(NamedTuple):
+    """Per-pair compatibility components, each broadcast to the grid shape"""
+    style: np.ndarray
+    vibe: np.ndarray
+    condition: np.ndarray
+    category: np.ndarray
+    size: np.ndarray
+    overall: np.ndarray
+
+
+class FairnessScores(NamedTuple):
+    """Per-pair fairness components, each broadcast to the grid shape"""
+    condition: np.ndarray
+    rarity: np.ndarray
+    overall: np.ndarray
+
+
+def tag_mask(tags: Iterable[str]) -> int:
+    """Style tags as an int bitmask over TAG_INDEX, registering unseen tags"""
+    tags = set(tags)
+    unseen = [tag for tag in tags if tag not in TAG_INDEX]
+    if len(_TAG_NAMES) + len(unseen) > MAX_STYLE_TAGS:
+        raise ValueError(f"Style tag vocabulary is full ({MAX_STYLE_TAGS} tags)")
+
+    for tag in unseen:
+        TAG_INDEX[tag] = len(_TAG_NAMES)
+        _TAG_NAMES.append(tag)
+
+    mask = 0
+    for tag in tags:
+        mask |= 1 << TAG_INDEX[tag]
+    return mask
+
+
+def local_tag_masks(*tag_collections: Iterable[str]) -> Tuple[List[int], List[str]]:
+    """
+    Bitmasks of a few tag collections over a vocabulary built from just their tags,
+    plus the tag behind each bit; masks from one call are comparable with each other only
+    """
+    index: Dict[str, int] = {}
+    masks = []
+    for tags in tag_collections:
+        mask = 0
+        for tag in tags:
+            mask |= 1 << index.setdefault(tag, len(index))
+        masks.append(mask)
+    return masks, list(index)
+
+
+def tag_bits(mask: int) -> List[int]:
+    """Set bit positions of mask in ascending order, visiting only the set bits"""
+    bits = []
+    while mask:
+        low = mask & -mask
+        bits.append(low.bit_length() - 1)
+        mask ^= low
+    return bits
+
+
+def tag_names(mask: int, names: List[str] = _TAG_NAMES) -> List[str]:
+    """Tags whose bits are set in mask, in registration order (TAG_INDEX unless names is given)"""
+    return [names[bit] for bit in tag_bits(mask)]
+
+
+def style_masks(masks: Iterable[int]) -> np.ndarray:
+    """
+    Pack tag masks into a 1-D object array (Python ints, so the vocabulary may exceed 64 tags)
+    Masks must share one vocabulary: all from tag_mask, or all from one local_tag_masks call
+    """
+    return np.array(list(masks), dtype=object)
+
+
+def encode_labels(*columns: Iterable[Any]) -> Tuple[np.ndarray, ...]:
+    """
+    Map label columns (category, size, vibe) to shared int codes
+    Codes compare with == far faster than strings when scoring large grids
+    """
+    arrays = [np.asarray(column, dtype=object) for column in columns]
+    values = np.concatenate([array.ravel() for array in arrays]).astype(str)
+    _, codes = np.unique(values, return_inverse=True)
+
+    encoded = []
+    offset = 0
+    for array in arrays:
+        encoded.append(codes[offset:offset + array.size].reshape(array.shape))
+        offset += array.size
+    return tuple(encoded)
+
+
+# Grids at least this large go to the multithreaded kernel; smaller ones (like the single
+# pair behind each tool call) stay on one thread and never start numba's thread pool
+PARALLEL_MIN_PAIRS = 100_000
+
+if njit is not None:
+    # No fastmath: reassociating the sum shifts reported percentages and threshold labels
+    @njit(cache=True)
+    def _weighted_sum(style, vibe, cond_a, cond_b, cat_eq, size_eq):
+        """Weighted compatibility sum of one pair, in the same order as the NumPy path"""
+        return (style * STYLE_WEIGHT + vibe * VIBE_WEIGHT +
+                (1.0 - abs(cond_a - cond_b)) * CONDITION_WEIGHT +
+                cat_eq * CATEGORY_WEIGHT + size_eq * SIZE_WEIGHT)
+
+    @njit(cache=True)
+    def _score_kernel(style, vibe, cond_a, cond_b, cat_eq, size_eq, out):
+        """Weighted compatibility sum over flat float64 columns, compiled once to native code"""
+        for i in range(out.shape[0]):
+            out[i] = _weighted_sum(style[i], vibe[i], cond_a[i], cond_b[i], cat_eq[i], size_eq[i])
+
+    @njit(cache=True, parallel=True)
+    def _score_kernel_parallel(style, vibe, cond_a, cond_b, cat_eq, size_eq, out):
+        """_score_kernel split across numba's thread pool"""
+        for i in prange(out.shape[0]):
+            out[i] = _weighted_sum(style[i], vibe[i], cond_a[i], cond_b[i], cat_eq[i], size_eq[i])
+
+    # Compile (or load from the on-disk cache) at import rather than on the first request
+    _warmup = np.zeros(1)
+    _score_kernel(_warmup, _warmup, _warmup, _warmup, _warmup, _warmup, np.empty(1))
+else:
+    _score_kernel = _score_kernel_parallel = None
+
+
+if cuda is not None:
+    @cuda.jit
+    def _cuda_score_kernel(cond, cat, size, vibe, tag_count, style_mask, target, candidates, out):
+        """Overall compatibility of garment `target` against each candidate row, one thread per candidate"""
+        i = cuda.grid(1)
+        if i < candidates.shape[0]:
+            j = candidates[i]
+            shared = cuda.popc(style_mask[target] & style_mask[j])
+            union = tag_count[target] + tag_count[j] - shared
+            style = shared / union if union > 0 else 0.0
+            out[i] = (style * STYLE_WEIGHT +
+                      (1.0 if vibe[target] == vibe[j] else 0.5) * VIBE_WEIGHT +
+                      (1.0 - abs(float(cond[target]) - float(cond[j])) / 255.0) * CONDITION_WEIGHT +
+                      (1.0 if cat[target] == cat[j] else 0.0) * CATEGORY_WEIGHT +
+                      (1.0 if size[target] == size[j] else 0.0) * SIZE_WEIGHT)
+else:
+    _cuda_score_kernel = None
+
+
+@functools.lru_cache(maxsize=1)
+def _gpu_available() -> bool:
+    return _cuda_score_kernel is not None and cuda.is_available()
+
+
+def _jaccard(mask_a: int, mask_b: int) -> float:
+    return (mask_a & mask_b).bit_count() / max((mask_a | mask_b).bit_count(), 1)
+
+
+_style_overlap = np.frompyfunc(_jaccard, 2, 1)
+
+
+def _combine(style: np.ndarray, vibe: np.ndarray, cond_a: np.ndarray, cond_b: np.ndarray,
+             category: np.ndarray, size: np.ndarray) -> PairScores:
+    """Broadcast the per-component scores together and take the weighted sum"""
+
+    style, vibe, cond_a, cond_b, category, size = np.broadcast_arrays(
+        style, vibe, np.asarray(cond_a, dtype=np.float64), np.asarray(cond_b, dtype=np.float64),
+        category, size
+    )
+    condition = 1.0 - np.abs(cond_a - cond_b)
+
+    if _score_kernel is not None:
+        overall = np.empty(style.shape)
+        kernel = _score_kernel_parallel if overall.size >= PARALLEL_MIN_PAIRS else _score_kernel
+        kernel(*(np.ascontiguousarray(column).reshape(-1)
+                 for column in (style, vibe, cond_a, cond_b, category, size)),
+               overall.reshape(-1))
+    else:
+        overall = (style * STYLE_WEIGHT + vibe * VIBE_WEIGHT + condition * CONDITION_WEIGHT +
+                   category * CATEGORY_WEIGHT + size * SIZE_WEIGHT)
+
+    return PairScores(style, vibe, condition, category, size, overall)
+
+
+def score_pairs(cond_a: np.ndarray, cond_b: np.ndarray,
+                cat_a: np.ndarray, cat_b: np.ndarray,
+                size_a: np.ndarray, size_b: np.ndarray,
+                style_masks_a: np.ndarray, style_masks_b: np.ndarray,
+                vibe_a: np.ndarray, vibe_b: np.ndarray) -> PairScores:
+    """
+    Compatibility of every garment in A against every garment in B
+    Inputs broadcast, so (M, 1) columns against (1, N) columns score an M x N grid.
+    Labels may be strings or codes from encode_labels; style tags are masks from style_masks
+    """
+
+    style = _style_overlap(style_masks_a, style_masks_b).astype(np.float64)
+    vibe = np.where(vibe_a == vibe_b, 1.0, 0.5)
+    category = (cat_a == cat_b).astype(np.float64)
+    size = (size_a == size_b).astype(np.float64)
+
+    return _combine(style, vibe, cond_a, cond_b, category, size)
+
+
+def fairness_pairs(cond_a: np.ndarray, cond_b: np.ndarray,
+                   rarity_a: np.ndarray, rarity_b: np.ndarray) -> FairnessScores:
+    """Swap fairness of every garment in A against every garment in B (inputs broadcast)"""
+
+    condition = 1.0 - np.abs(np.asarray(cond_a, dtype=np.float64) - cond_b)
+    rarity = 1.0 - np.abs(np.asarray(rarity_a, dtype=np.float64) - rarity_b)
+    overall = condition * CONDITION_FAIRNESS_WEIGHT + rarity * RARITY_FAIRNESS_WEIGHT
+
+    return FairnessScores(condition, rarity, overall)
+
+
+class GarmentTable:
+    """
+    Struct-of-arrays registry of garment features for bulk scoring
+    Condition and rarity are quantized to uint8 (x255), labels are interned to int32
+    codes, and style tags (bits of TAG_INDEX) are kept as a sparse garment x tag matrix
+    plus a uint64 bitmask of the first 64 tags for the GPU kernel
+    """
+
+    _COLUMNS = (('cond', np.uint8), ('rarity', np.uint8), ('cat', np.int32),
+                ('size', np.int32), ('vibe', np.int32), ('tag_count', np.int32),
+                ('style_mask', np.uint64))
+    _DEVICE_COLUMNS = ('cond', 'cat', 'size', 'vibe', 'tag_count', 'style_mask')
+
+    def __init__(self, capacity: int = 64):
+        self.count = 0
+        for column, dtype in self._COLUMNS:
+            setattr(self, column, np.zeros(capacity, dtype=dtype))
+
+        self.labels: Dict[str, Dict[str, int]] = {'cat': {}, 'size': {}, 'vibe': {}}
+        self._wide_tags = False  # some garment has a tag past the 64-bit style_mask
+        self._tag_rows: List[np.ndarray] = []
+        self._styles: Optional[sparse.csr_matrix] = None
+        self._device: Optional[Tuple[Any, ...]] = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def add(self, garment: Dict[str, Any]) -> int:
+        """Register a garment and return its row id"""
+
+        # Derive every value before touching the columns so a bad garment leaves no partial row
+        values = {
+            'cond': _quantize(garment.get('condition', 0.5)),
+            'rarity': _quantize(garment.get('rarity', 0.5)),
+            'cat': self._intern('cat', garment.get('category', '')),
+            'size': self._intern('size', garment.get('size', '')),
+            'vibe': self._intern('vibe', garment.get('vibe', ''))
+        }
+        mask = tag_mask(garment.get('style_tags', ()))
+        tags = np.array(tag_bits(mask), dtype=np.int32)
+        values['tag_count'] = len(tags)
+        values['style_mask'] = mask & _LOW_MASK
+
+        if self.count == len(self.cond):
+            self._grow()
+
+        row = self.count
+        for column, value in values.items():
+            getattr(self, column)[row] = value
+        self._wide_tags |= mask > _LOW_MASK
+        self._tag_rows.append(tags)
+        self._styles = None
+        self._device = None
+
+        self.count += 1
+        return row
+
+    def score(self, ids_a: np.ndarray, ids_b: np.ndarray) -> PairScores:
+        """Compatibility of garments ids_a against ids_b (id arrays broadcast like score_pairs)"""
+
+        ids_a, ids_b = np.broadcast_arrays(self._rows(ids_a), self._rows(ids_b))
+        flat_a = ids_a.reshape(-1)
+        flat_b = ids_b.reshape(-1)
+
+        styles = self._style_matrix()
+        shared = np.asarray(styles[flat_a].multiply(styles[flat_b]).sum(axis=1)).reshape(ids_a.shape)
+        union = self.tag_count[ids_a] + self.tag_count[ids_b] - shared
+        style = shared / np.maximum(union, 1)
+
+        return _combine(
+            style,
+            np.where(self.vibe[ids_a] == self.vibe[ids_b], 1.0, 0.5),
+            self.cond[ids_a] / 255.0,
+            self.cond[ids_b] / 255.0,
+            (self.cat[ids_a] == self.cat[ids_b]).astype(np.float64),
+            (self.size[ids_a] == self.size[ids_b]).astype(np.float64)
+        )
+
+    def score_column(self, target: int, candidates: np.ndarray) -> np.ndarray:
+        """
+        Overall compatibility of one garment against many candidate ids
+        Large candidate sets run on the GPU when CUDA is available and every style tag
+        fits the bitmask; anything else takes the NumPy path in score
+        """
+
+        target = int(self._rows(target))
+        candidates = self._rows(candidates)
+        if len(candidates) <= GPU_MIN_CANDIDATES or self._wide_tags or not _gpu_available():
+            return self.score(target, candidates).overall
+
+        out = cuda.device_array(len(candidates), dtype=np.float64)
+        blocks = (len(candidates) + GPU_THREADS_PER_BLOCK - 1) // GPU_THREADS_PER_BLOCK
+        _cuda_score_kernel[blocks, GPU_THREADS_PER_BLOCK](
+            *self._device_arrays(), target, cuda.to_device(candidates), out
+        )
+        return out.copy_to_host()
+
+    def fairness(self, ids_a: np.ndarray, ids_b: np.ndarray) -> FairnessScores:
+        """Swap fairness of garments ids_a against ids_b"""
+        ids_a, ids_b = self._rows(ids_a), self._rows(ids_b)
+        return fairness_pairs(self.cond[ids_a] / 255.0, self.cond[ids_b] / 255.0,
+                              self.rarity[ids_a] / 255.0, self.rarity[ids_b] / 255.0)
+
+    def _rows(self, ids: np.ndarray) -> np.ndarray:
+        """Row ids as an intp array, rejecting ids past the registered garments"""
+        ids = np.asarray(ids, dtype=np.intp)
+        if ids.size and (ids.min() < 0 or ids.max() >= self.count):
+            raise IndexError(f"garment ids must be in [0, {self.count})")
+        return ids
+
+    def _intern(self, kind: str, label: str) -> int:
+        codes = self.labels[kind]
+        return codes.setdefault(label, len(codes))
+
+    def _grow(self) -> None:
+        for column, _ in self._COLUMNS:
+            values = getattr(self, column)
+            grown = np.zeros(len(values) * 2, dtype=values.dtype)
+            grown[:len(values)] = values
+            setattr(self, column, grown)
+
+    def _device_arrays(self) -> Tuple[Any, ...]:
+        """Feature columns copied to the GPU once and reused until new garments are added"""
+        if self._device is None:
+            self._device = tuple(cuda.to_device(getattr(self, column)[:self.count])
+                                 for column in self._DEVICE_COLUMNS)
+        return self._device
+
+    def _style_matrix(self) -> sparse.csr_matrix:
+        """Garment x tag membership matrix, rebuilt only after new garments are added"""
+        if self._styles is None:
+            indptr = np.zeros(self.count + 1, dtype=np.int64)
+            np.cumsum(self.tag_count[:self.count], out=indptr[1:])
+            indices = np.concatenate(self._tag_rows) if self._tag_rows else np.zeros(0, dtype=np.int32)
+            self._styles = sparse.csr_matrix(
+                (np.ones(len(indices), dtype=np.int16), indices, indptr),
+                shape=(self.count, len(TAG_INDEX))
+            )
+        return self._styles
+
+
+def _quantize(value: float) -> int:
+    return int(round(min(max(value, 0.0), 1.0) * 255))
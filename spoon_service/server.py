@@ -1,112 +1,179 @@
 """
 SpoonOS Service API
-Flask server exposing garment agent functionality
+FastAPI app exposing garment agent functionality, served by uvicorn
 """
 
 import os
-import asyncio
-from flask import Flask, request, jsonify
-from flask_cors import CORS
+import contextlib
+import orjson
+import uvicorn
 from dotenv import load_dotenv
+from fastapi import FastAPI, Request
+from fastapi.responses import Response, StreamingResponse
 
 from garment_agent import (
-    generate_proposal_dialogue,
-    generate_acceptance_dialogue,
+    attach_style_tags,
+    close_llm_clients,
+    generate_dialogue_pair,
+    stream_dialogue_pair,
     analyze_compatibility_with_reasoning
 )
 
 load_dotenv()
 
-app = Flask(__name__)
-CORS(app)
+ORIGIN = os.getenv('CORS_ALLOWED_ORIGIN', '*')
+_CORS_HEADERS = [
+    (b'access-control-allow-origin', ORIGIN.encode()),
+    (b'access-control-allow-methods', b'POST,GET,OPTIONS'),
+    (b'access-control-allow-headers', b'Content-Type')
+]
 
 
-@app.route('/health', methods=['GET'])
-def health():
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    yield
+    # Provider clients hold connections on this worker's event loop
+    await close_llm_clients()
+
+
+class StaticCORS:
+    """Adds fixed CORS headers to every response and answers preflights directly"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        if scope['method'] == 'OPTIONS':
+            await send({'type': 'http.response.start', 'status': 204, 'headers': _CORS_HEADERS})
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+
+        async def send_with_cors(message):
+            if message['type'] == 'http.response.start':
+                message['headers'] = list(message.get('headers', ())) + _CORS_HEADERS
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
+
+
+app = FastAPI(title="SpoonOS Garment Agent Service", lifespan=lifespan)
+app.add_middleware(StaticCORS)
+
+
+def _json(payload, status_code=200):
+    """JSON response encoded with orjson"""
+    return Response(orjson.dumps(payload), status_code=status_code, media_type='application/json')
+
+
+def _sse(event, payload):
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(payload) + b"\n\n"
+
+
+async def _stream_dialogue(garment_a, garment_b, compatibility_score):
+    """Server-sent events: garmentA/garmentB text deltas, then a final done event"""
+    try:
+        # Inside the try: headers are already sent, so failures must become an error event
+        speakers = {
+            'proposal': ('garmentA', garment_a['name']),
+            'acceptance': ('garmentB', garment_b['name'])
+        }
+        async for turn, delta in stream_dialogue_pair(garment_a, garment_b, compatibility_score):
+            event, name = speakers[turn]
+            yield _sse(event, {"name": name, "delta": delta})
+    except Exception as e:
+        yield _sse('error', {"error": str(e)})
+        return
+
+    yield _sse('done', {
+        "compatibility": int(compatibility_score * 100),
+        "powered_by": "SpoonOS Framework"
+    })
+
+
+@app.get('/health')
+async def health():
     """Health check endpoint"""
-    return jsonify({
+    return _json({
         "status": "ok",
         "service": "SpoonOS Garment Agent Service",
         "llm_provider": os.getenv('DEFAULT_LLM_PROVIDER', 'openai')
     })
 
 
-@app.route('/dialogue/generate', methods=['POST'])
-def generate_dialogue():
+@app.post('/dialogue/generate')
+async def generate_dialogue(request: Request):
     """
     Generate complete dialogue between two garments
     Expects: garment_a, garment_b, compatibility_score
+    Streams server-sent events instead when stream is true or the client accepts text/event-stream
     """
     try:
-        data = request.json
+        data = orjson.loads(await request.body())
         garment_a = data.get('garment_a')
         garment_b = data.get('garment_b')
         compatibility_score = data.get('compatibility_score', 0.7)
 
         if not garment_a or not garment_b:
-            return jsonify({"error": "Missing garment data"}), 400
+            return _json({"error": "Missing garment data"}, 400)
 
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+        attach_style_tags(garment_a, rebuild=True)
+        attach_style_tags(garment_b, rebuild=True)
 
-        proposal = loop.run_until_complete(
-            generate_proposal_dialogue(garment_a, garment_b, compatibility_score)
-        )
+        if data.get('stream') or 'text/event-stream' in request.headers.get('accept', ''):
+            return StreamingResponse(
+                _stream_dialogue(garment_a, garment_b, compatibility_score),
+                media_type='text/event-stream',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            )
 
-        acceptance = loop.run_until_complete(
-            generate_acceptance_dialogue(garment_b, garment_a, compatibility_score)
-        )
+        dialogue = await generate_dialogue_pair(garment_a, garment_b, compatibility_score)
 
-        loop.close()
-
-        return jsonify({
+        return _json({
             "garmentA": {
                 "name": garment_a['name'],
-                "text": proposal
+                "text": dialogue['proposal']
             },
             "garmentB": {
                 "name": garment_b['name'],
-                "text": acceptance
+                "text": dialogue['acceptance']
             },
             "compatibility": int(compatibility_score * 100),
             "powered_by": "SpoonOS Framework"
         })
 
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return _json({"error": str(e)}, 500)
 
 
-@app.route('/compatibility/analyze', methods=['POST'])
-def analyze_compatibility():
+@app.post('/compatibility/analyze')
+async def analyze_compatibility(request: Request):
     """
     Analyze compatibility between two garments with AI reasoning
     Expects: garment_a, garment_b
     """
     try:
-        data = request.json
+        data = orjson.loads(await request.body())
         garment_a = data.get('garment_a')
         garment_b = data.get('garment_b')
 
         if not garment_a or not garment_b:
-            return jsonify({"error": "Missing garment data"}), 400
-
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-
-        analysis = loop.run_until_complete(
-            analyze_compatibility_with_reasoning(garment_a, garment_b)
-        )
+            return _json({"error": "Missing garment data"}, 400)
 
-        loop.close()
+        analysis = await analyze_compatibility_with_reasoning(garment_a, garment_b)
 
-        return jsonify(analysis)
+        return _json(analysis)
 
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return _json({"error": str(e)}, 500)
 
 
 if __name__ == '__main__':
     port = int(os.getenv('SPOON_SERVICE_PORT', 5000))
-    print(f"Starting SpoonOS Garment Agent Service on port {port}")
+    workers = int(os.getenv('SPOON_SERVICE_WORKERS', 1))
+    print(f"Starting SpoonOS Garment Agent Service on port {port} ({workers} workers)")
     print(f"LLM Provider: {os.getenv('DEFAULT_LLM_PROVIDER', 'openai')}")
-    app.run(host='0.0.0.0', port=port, debug=False)
+    # "auto" picks uvloop and httptools whenever they are installed
+    uvicorn.run('server:app', host='0.0.0.0', port=port, workers=workers, loop='auto', http='auto')
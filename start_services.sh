@@ -25,7 +25,8 @@ fi
 # Start SpoonOS service in background
 echo "🐍 Starting SpoonOS Service (Python)..."
 cd spoon_service
-python server.py &
+uvicorn server:app --host 0.0.0.0 --port "${SPOON_SERVICE_PORT:-5000}" \
+    --workers "${SPOON_SERVICE_WORKERS:-1}" --loop uvloop --http httptools &
 SPOON_PID=$!
 cd ..
 